@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from vanilla_ml.util.buffer_pool import BufferPool
+
+
+class TestBufferPool(unittest.TestCase):
+
+    def test_rent_release_reuse(self):
+        pool = BufferPool()
+        a = pool.rent((4, 3))
+        self.assertEqual(a.shape, (4, 3))
+
+        pool.release(a)
+        b = pool.rent((4, 3))
+        self.assertIs(a, b)
+
+    def test_rent_different_sizes(self):
+        pool = BufferPool()
+        a = pool.rent((4, 3))
+        pool.release(a)
+
+        b = pool.rent((2, 3))
+        self.assertIsNot(a, b)
+        self.assertEqual(b.shape, (2, 3))
+
+        c = pool.rent((4, 3), dtype=np.float32)
+        self.assertIsNot(a, c)
+        self.assertEqual(c.dtype, np.float32)
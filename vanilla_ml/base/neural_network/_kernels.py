@@ -0,0 +1,43 @@
+"""
+Numba-compiled kernels for the hot Linear + Sigmoid path.
+
+Numba is optional: when it is not installed HAVE_NUMBA is False and
+callers fall back to the plain NumPy implementations.
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+if HAVE_NUMBA:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def linear_sigmoid_forward(input_data, W, b, output):
+        """ output = sigmoid(input_data @ W + b), fused in one pass. """
+        Z = np.dot(input_data, W)
+        n, k = Z.shape
+        for i in prange(n):
+            for j in range(k):
+                output[i, j] = 1. / (1. + np.exp(-(Z[i, j] + b[0, j])))
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def linear_sigmoid_backward(input_data, output, W, grad_output,
+                                W_grad, b_grad, grad_input):
+        """ Backward for the fused layer: folds the sigmoid derivative
+        into grad_output, then computes the weight/bias/input gradients.
+        """
+        n, k = output.shape
+        dZ = np.empty_like(output)
+        for i in prange(n):
+            for j in range(k):
+                dZ[i, j] = grad_output[i, j] * output[i, j] * (1. - output[i, j])
+        W_grad[:, :] = np.dot(input_data.T, dZ)
+        for j in prange(k):
+            acc = 0.
+            for i in range(n):
+                acc += dZ[i, j]
+            b_grad[0, j] = acc
+        grad_input[:, :] = np.dot(dZ, W.T)
@@ -1,6 +1,7 @@
 import numpy as np
 
-from module import Module
+from vanilla_ml.base.neural_network.module import Module
+from vanilla_ml.util.misc import sigmoid
 
 
 class ReLU(Module):
@@ -24,7 +25,13 @@ class ReLU(Module):
 class Sigmoid(Module):
 
     def fprop(self, input_data):
-        self.output = 1. / (1 + np.exp(-input_data))
+        if self.pool is not None:
+            if self.output is not None:
+                self.pool.release(self.output)
+            out = self.pool.rent(input_data.shape, input_data.dtype)
+            self.output = sigmoid(input_data, out=out)
+        else:
+            self.output = sigmoid(input_data)
         return self.output
 
     def bprop(self, input_data, grad_output):
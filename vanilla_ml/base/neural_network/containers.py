@@ -1,4 +1,4 @@
-from module import Module
+from vanilla_ml.base.neural_network.module import Module
 
 
 class Container(Module):
@@ -11,6 +11,17 @@ class Container(Module):
 
     def add(self, m):
         self.modules.append(m)
+        if self.pool is not None:
+            m.set_pool(self.pool)
+
+    def set_pool(self, pool):
+        self.pool = pool
+        for module in self.modules:
+            module.set_pool(pool)
+
+    def reset(self, rng):
+        for module in self.modules:
+            module.reset(rng)
 
     def update(self, params):
         for module in self.modules:
@@ -1,18 +1,20 @@
 import numpy as np
 
-from module import Module
-from weight import Weight
+from vanilla_ml.base.neural_network import _kernels
+from vanilla_ml.base.neural_network.module import Module
+from vanilla_ml.base.neural_network.weight import Weight
+from vanilla_ml.util.misc import sigmoid
 
 class Linear(Module):
     """
     Linear Layer (feed-forward layer)
     """
-    def __init__(self, in_dim, out_dim):
+    def __init__(self, in_dim, out_dim, dtype=np.float64):
         super(Linear, self).__init__()
         self.in_dim  = in_dim
         self.out_dim = out_dim
-        self.weight  = Weight((in_dim, out_dim))
-        self.bias    = Weight((1, out_dim))
+        self.weight  = Weight((in_dim, out_dim), dtype)
+        self.bias    = Weight((1, out_dim), dtype)
 
     def fprop(self, input_data):
         # high_dimension_input = input_data.ndim > 2
@@ -21,7 +23,18 @@ class Linear(Module):
         # if high_dimension_input:
         #     input_data = input_data.reshape(input_data.shape[0], -1)
 
-        self.output = np.dot(input_data, self.weight.D) + self.bias.D
+        if self.pool is not None:
+            # Rent the output buffer; the previous iteration's output is
+            # no longer needed, so recycle it first.
+            if self.output is not None:
+                self.pool.release(self.output)
+            out = self.pool.rent((input_data.shape[0], self.out_dim),
+                                 np.result_type(input_data, self.weight.D))
+            np.dot(input_data, self.weight.D, out=out)
+            out += self.bias.D
+            self.output = out
+        else:
+            self.output = np.dot(input_data, self.weight.D) + self.bias.D
 
         # # Reshape output
         # if high_dimension_input:
@@ -43,7 +56,15 @@ class Linear(Module):
         # self.bias.grad   = self.bias.grad + grad_output.sum(axis=0)
         self.weight.grad = np.dot(input_data.T, grad_output)
         self.bias.grad   = grad_output.sum(axis=0)
-        self.grad_input  = np.dot(grad_output, self.weight.D.T)
+        if self.pool is not None:
+            if self.grad_input is not None:
+                self.pool.release(self.grad_input)
+            self.grad_input = self.pool.rent(
+                (grad_output.shape[0], self.in_dim),
+                np.result_type(grad_output, self.weight.D))
+            np.dot(grad_output, self.weight.D.T, out=self.grad_input)
+        else:
+            self.grad_input = np.dot(grad_output, self.weight.D.T)
 
         # if high_dimension_input:
         #     self.grad_input = self.grad_input.reshape(orig_input_data_shape)
@@ -54,6 +75,99 @@ class Linear(Module):
         self.weight.update(params)
         self.bias.update(params)
 
+    def reset(self, rng):
+        self.weight.reset(rng)
+        self.bias.reset(rng)
+
+    def share(self, m):
+        self.weight = m.weight
+        self.bias = m.bias
+
+
+class FusedLinearSigmoid(Module):
+    """
+    Linear layer fused with a sigmoid activation.
+
+    When Numba is installed and the batch is large enough to amortize
+    kernel dispatch, forward and backward run as compiled parallel
+    kernels; otherwise they fall back to NumPy ops equivalent to
+    Linear followed by Sigmoid.
+    """
+
+    # Below this many output elements per batch, plain NumPy beats
+    # dispatching into the compiled kernels.
+    MIN_KERNEL_ELEMS = 4096
+
+    def __init__(self, in_dim, out_dim, dtype=np.float64):
+        super(FusedLinearSigmoid, self).__init__()
+        self.in_dim  = in_dim
+        self.out_dim = out_dim
+        self.weight  = Weight((in_dim, out_dim), dtype)
+        self.bias    = Weight((1, out_dim), dtype)
+
+    def _use_kernels(self, n_samples):
+        return _kernels.HAVE_NUMBA and \
+            n_samples * self.out_dim >= FusedLinearSigmoid.MIN_KERNEL_ELEMS
+
+    def fprop(self, input_data):
+        if self.pool is not None:
+            if self.output is not None:
+                self.pool.release(self.output)
+            out = self.pool.rent((input_data.shape[0], self.out_dim),
+                                 np.result_type(input_data, self.weight.D))
+        else:
+            out = np.empty((input_data.shape[0], self.out_dim),
+                           np.result_type(input_data, self.weight.D))
+
+        if self._use_kernels(input_data.shape[0]):
+            _kernels.linear_sigmoid_forward(input_data, self.weight.D,
+                                            self.bias.D, out)
+            self.output = out
+        else:
+            np.dot(input_data, self.weight.D, out=out)
+            out += self.bias.D
+            self.output = sigmoid(out, out=out)
+        return self.output
+
+    def bprop(self, input_data, grad_output):
+        if self.pool is not None:
+            if self.grad_input is not None:
+                self.pool.release(self.grad_input)
+            self.grad_input = self.pool.rent(
+                (grad_output.shape[0], self.in_dim),
+                np.result_type(grad_output, self.weight.D))
+        else:
+            self.grad_input = np.empty(
+                (grad_output.shape[0], self.in_dim),
+                np.result_type(grad_output, self.weight.D))
+
+        if self._use_kernels(grad_output.shape[0]):
+            # The kernel writes gradients in place, so they must match
+            # the weights' shapes and dtypes exactly.
+            if self.weight.grad.dtype != self.weight.D.dtype:
+                self.weight.grad = np.empty_like(self.weight.D)
+            if self.bias.grad.shape != self.bias.D.shape or \
+                    self.bias.grad.dtype != self.bias.D.dtype:
+                self.bias.grad = np.empty_like(self.bias.D)
+            _kernels.linear_sigmoid_backward(
+                input_data, self.output, self.weight.D, grad_output,
+                self.weight.grad, self.bias.grad, self.grad_input)
+        else:
+            # Fold the sigmoid derivative into the incoming gradient
+            grad_z = grad_output * self.output * (1. - self.output)
+            self.weight.grad = np.dot(input_data.T, grad_z)
+            self.bias.grad   = grad_z.sum(axis=0)
+            np.dot(grad_z, self.weight.D.T, out=self.grad_input)
+        return self.grad_input
+
+    def update(self, params):
+        self.weight.update(params)
+        self.bias.update(params)
+
+    def reset(self, rng):
+        self.weight.reset(rng)
+        self.bias.reset(rng)
+
     def share(self, m):
         self.weight = m.weight
         self.bias = m.bias
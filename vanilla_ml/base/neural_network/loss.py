@@ -4,6 +4,7 @@ from abc import ABCMeta, abstractmethod
 import numpy as np
 
 from vanilla_ml.util.metrics.ranking import delta_ndcg, delta_dcg
+from vanilla_ml.util.misc import logsumexp_cross_entropy, softmax
 
 
 class Loss(object):
@@ -38,17 +39,27 @@ class MSELoss(Loss):
 
 class CrossEntropyLoss(Loss):
 
-    def __init__(self, eps=1e-7, size_average=True, do_softmax_bprop=False):
+    def __init__(self, eps=1e-7, size_average=True, do_softmax_bprop=False,
+                 from_logits=False):
         self.eps = eps
         self.size_average = size_average
         self.do_softmax_bprop = do_softmax_bprop
+        self.from_logits = from_logits
 
     def fprop(self, input_data, target_data):
+        if self.from_logits:
+            # Fused log-softmax + negative log-likelihood, computed from
+            # raw logits in a single log-sum-exp pass.
+            cost = logsumexp_cross_entropy(input_data, target_data)
+            if not self.size_average:
+                cost *= input_data.shape[0]
+            return cost
+
         # tmp = [(t, i) for i, t in enumerate(target_data)]
         # z = zip(*tmp)  # unzipping trick !
 
         tmp = [(i, t) for i, t in enumerate(target_data)]
-        z = zip(*tmp)  # unzipping trick !
+        z = tuple(zip(*tmp))  # unzipping trick !
 
         # z = target_data
         cost = -np.sum(np.log(input_data[z]))
@@ -62,12 +73,14 @@ class CrossEntropyLoss(Loss):
         # z = zip(*tmp)
 
         tmp = [(i, t) for i, t in enumerate(target_data)]
-        z = zip(*tmp)  # unzipping trick !
+        z = tuple(zip(*tmp))  # unzipping trick !
 
         # z = target_data
 
         if self.do_softmax_bprop:
-            grad_input = np.copy(input_data)
+            # With from_logits the softmax probabilities were never
+            # materialized in fprop, so compute them here.
+            grad_input = softmax(input_data) if self.from_logits else np.copy(input_data)
             grad_input[z] -= 1
         else:
             grad_input = np.zeros_like(input_data, np.float32)
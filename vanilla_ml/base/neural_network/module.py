@@ -10,6 +10,15 @@ class Module(object):
     def __init__(self):
         self.output     = None
         self.grad_input = None
+        self.pool       = None  # optional BufferPool for intermediates
+
+    def set_pool(self, pool):
+        """ Attach a BufferPool for renting intermediate arrays. """
+        self.pool = pool
+
+    def reset(self, rng):
+        """ Re-initialize the module's weights in place, if any. """
+        pass
 
     @abstractmethod
     def fprop(self, input_data):
@@ -2,16 +2,18 @@ import numpy as np
 
 
 class Weight(object):
-    def __init__(self, sz):
+    def __init__(self, sz, dtype=np.float64):
         """
         Initialize weight
         Args:
             sz (tuple): shape
+            dtype: weight dtype
         """
         self.sz = sz
-        self.D = 0.1 * np.random.standard_normal(sz)
+        self.dtype = np.dtype(dtype)
+        self.D = (0.1 * np.random.standard_normal(sz)).astype(self.dtype)
         # self.D = np.ones(sz)   # TODO: Remove this
-        self.grad = np.zeros(sz, np.float32)
+        self.grad = np.zeros(sz, self.dtype)
 
         # print("D = %s, grad = %s" % (self.D, self.grad))
 
@@ -34,8 +36,19 @@ class Weight(object):
 
         self.grad[:] = 0
 
+    def reset(self, rng):
+        """
+        Re-draw the weights in place (e.g. when a cached model is
+        reused across fits), avoiding fresh allocations.
+        Args:
+            rng (np.random.Generator): random generator
+        """
+        rng.standard_normal(out=self.D, dtype=self.dtype)
+        self.D *= 0.1
+        self.grad[:] = 0
+
     def clone(self):
-        m = Weight(self.sz)
+        m = Weight(self.sz, self.dtype)
         m.D = np.copy(self.D)
         m.grad = np.copy(self.grad)
         return m
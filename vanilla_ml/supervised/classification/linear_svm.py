@@ -36,6 +36,7 @@ class LinearSVM(AbstractClassifier):
         self.random_state = random_state
         self._classes = None
         self.w = None
+        self._penalty_buf = None
 
     def fit(self, X, y, sample_weights=None):
         assert sample_weights is None, "Sample weights are not supported!"
@@ -51,6 +52,8 @@ class LinearSVM(AbstractClassifier):
 
         n_samples, n_features = X.shape
         self.w = np.zeros(n_features)
+        if self.penalty_type is not None:
+            self._penalty_buf = np.empty_like(self.w)
         sign_y = label_to_sign(y)
         self._classes = np.unique(sign_y)
 
@@ -85,7 +88,8 @@ class LinearSVM(AbstractClassifier):
         yX = np.dot(X.T, sign_y)
         grad = -yX if np.inner(self.w, yX) <= 1 else 0
         if self.penalty_type is not None:
-            grad += misc.get_penalty(self.w, self.penalty_factor, self.penalty_type)
+            grad += misc.get_penalty(self.w, self.penalty_factor, self.penalty_type,
+                                     out=self._penalty_buf)
 
         return grad
 
@@ -35,6 +35,7 @@ class LogisticRegression(AbstractClassifier):
         self.random_state = random_state
         self._classes = None
         self.w = None
+        self._penalty_buf = None
 
     def fit(self, X, y, sample_weights=None):
         assert sample_weights is None, "Sample weights are not supported!"
@@ -51,6 +52,8 @@ class LogisticRegression(AbstractClassifier):
         self._classes = np.unique(y)
         n_samples, n_features = X.shape
         self.w = np.zeros(n_features)
+        if self.penalty_type is not None:
+            self._penalty_buf = np.empty_like(self.w)
 
         # SGD
         indices = np.arange(n_samples)
@@ -86,7 +89,8 @@ class LogisticRegression(AbstractClassifier):
         # TODO: Is this correct or grad = (pred_proba_y - y) * X
         grad = np.dot(pred_proba_y - y, X)
         if self.penalty_type is not None:
-            grad += misc.get_penalty(self.w, self.penalty_factor, self.penalty_type)
+            grad += misc.get_penalty(self.w, self.penalty_factor, self.penalty_type,
+                                     out=self._penalty_buf)
 
         return grad
 
@@ -35,6 +35,7 @@ class MaxEnt(AbstractClassifier):
         self.random_state = random_state
         self._classes = None
         self.w = None
+        self._penalty_buf = None
 
     def fit(self, X, y, sample_weights=None):
         assert sample_weights is None, "Sample weights are not supported!"
@@ -54,6 +55,8 @@ class MaxEnt(AbstractClassifier):
 
         n_samples, n_features = X.shape
         self.w = np.zeros((n_classes, n_features))
+        if self.penalty_type is not None:
+            self._penalty_buf = np.empty_like(self.w)
         # self.w = np.random.randn(n_classes, n_features)
 
         # SGD
@@ -86,7 +89,8 @@ class MaxEnt(AbstractClassifier):
         mu = pred_proba_y - one_hot_y
         grad = np.dot(mu.T, X)  # grad's shape = K x P (same shape as w's)
         if self.penalty_type is not None:
-            grad += misc.get_penalty(self.w, self.penalty_factor, self.penalty_type)
+            grad += misc.get_penalty(self.w, self.penalty_factor, self.penalty_type,
+                                     out=self._penalty_buf)
 
         return grad
 
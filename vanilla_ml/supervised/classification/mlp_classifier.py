@@ -3,23 +3,25 @@ Multi-layer Perceptron (Feed-forward Neural Network)
 """
 import numpy as np
 
-from vanilla_ml.base.neural_network.activators import Sigmoid, Softmax
 from vanilla_ml.base.neural_network.containers import Sequential
-from vanilla_ml.base.neural_network.layers import Linear
+from vanilla_ml.base.neural_network.layers import FusedLinearSigmoid, Linear
 from vanilla_ml.base.neural_network.loss import CrossEntropyLoss
 from vanilla_ml.supervised.classification.abstract_classifier import AbstractClassifier
+from vanilla_ml.util.buffer_pool import BufferPool
 from vanilla_ml.util.metrics.accuracy import accuracy_score
+from vanilla_ml.util.misc import softmax
 
 
 class MLPClassifier(AbstractClassifier):
 
     # TODO: n_epochs, tol shouldn't be in the constructor
     def __init__(self, layers, learning_rate=1.0, batch_size=10, n_epochs=50,
-                 tol=1e-5, verbose=True, random_state=42):
+                 tol=1e-5, verbose=True, random_state=42, dtype=np.float32):
 
         assert learning_rate > 0, "Learning rate must be positive."
 
         self.layers = layers
+        self.dtype = np.dtype(dtype)
         self.lr = learning_rate
         self.batch_size = batch_size
         self.n_epochs = n_epochs
@@ -31,6 +33,7 @@ class MLPClassifier(AbstractClassifier):
         self.output_size = None
         self.model = None
         self.loss = None
+        self._built_shape = None
 
     def fit(self, X, y, sample_weights=None):
         assert sample_weights is None, "Specifying sample weights is not supported!"
@@ -38,47 +41,68 @@ class MLPClassifier(AbstractClassifier):
 
         np.random.seed(self.random_state)
 
+        # Train in float32 by default to halve the memory traffic
+        # through the layers' GEMMs and activations.
+        X = np.ascontiguousarray(X, dtype=self.dtype)
+
         n_samples, self.input_size = X.shape
         self._classes = np.unique(y)
         self.output_size = len(self._classes)
 
-        # Model
-        self.model, self.loss = self._build_model()
+        # Model. Rebuild only when the architecture changed; repeated
+        # fits on same-shape data (e.g. cross-validation folds) reuse
+        # the cached layers and just re-draw their weights in place.
+        built_shape = (self.input_size, tuple(self.layers), self.output_size)
+        if self._built_shape == built_shape:
+            self.model.reset(np.random.default_rng(self.random_state))
+        else:
+            self.model, self.loss = self._build_model()
+
+            # Rent forward/backward intermediates from a shared pool so the
+            # fixed-shape minibatch iterations stop hitting the allocator.
+            self.model.set_pool(BufferPool())
+            self._built_shape = built_shape
 
         # SGD params
         params = {"lrate": self.lr, "max_grad_norm": 40}
 
-        indices = np.arange(n_samples)
+        n_batches = n_samples // self.batch_size
 
         # Run SGD
         for epoch in range(self.n_epochs):
             if self.verbose and (epoch + 1) % 10 == 0:
                 print("Epoch %d ..." % (epoch + 1))
 
+            # Shuffle once per epoch and view the data as contiguous batches
+            # so the inner loop avoids per-iteration fancy indexing.
+            perm = np.random.permutation(n_samples)
+            shuffled_X, shuffled_y = X[perm], y[perm]
+            batched_X = shuffled_X[:n_batches * self.batch_size].reshape(
+                n_batches, self.batch_size, self.input_size)
+            batched_y = shuffled_y[:n_batches * self.batch_size].reshape(
+                n_batches, self.batch_size)
+
             # For report
             total_err  = 0.
             total_cost = 0.
             total_num  = 0
 
-            for it in range(n_samples / self.batch_size):
+            for it in range(n_batches):
 
-                # batch = np.random.choice(indices, size=self.batch_size, replace=False)
-                start = it * self.batch_size
-                end = min((it + 1) * self.batch_size, n_samples)
-                batch = indices[start:end]
-                input_data, target_data = X[batch], y[batch]
+                input_data, target_data = batched_X[it], batched_y[it]
 
                 # Forward propagation
                 out = self.model.fprop(input_data)
-                total_cost += self.loss.fprop(out, target_data)
+                batch_cost = self.loss.fprop(out, target_data)
                 pred = out.argmax(axis=1)
-                total_err += accuracy_score(pred, target_data)
-                total_num += len(batch)
+                batch_acc = accuracy_score(target_data, pred)
+                total_cost += batch_cost
+                total_err += batch_acc
+                total_num += len(target_data)
 
-                if self.verbose:
-                    print("\n* Iter %d" % (it + 1))
-                    print("loss = %s" % self.loss.fprop(out, target_data))
-                    print("Accuracy = %.2f%%" % (100. * accuracy_score(target_data, pred)))
+                if self.verbose and (it + 1) % 10 == 0:
+                    print("\n* Iter %d: loss = %.4f, accuracy = %.2f%%"
+                          % (it + 1, batch_cost, 100. * batch_acc))
 
                 # Backward propagation
                 grad_output = self.loss.bprop(out, target_data)
@@ -90,27 +114,29 @@ class MLPClassifier(AbstractClassifier):
                 print("%d | train error: %g" % (total_num + 1, total_err / total_num))
                 print("pred =\n%s" % pred)
                 print("target_data =\n%s" % target_data)
-                print("accuracy = %.2f%%" % (100. * accuracy_score(pred, target_data)))
+                print("accuracy = %.2f%%" % (100. * batch_acc))
 
     def predict_proba(self, X):
-        return self.model.fprop(X)
+        X = np.ascontiguousarray(X, dtype=self.dtype)
+        return softmax(self.model.fprop(X))
 
     def _build_model(self):
         input_size, layer_sizes, output_size = self.input_size, self.layers, self.output_size
 
         model = Sequential()
         for i in range(len(layer_sizes)):
+            # Fused Linear + Sigmoid (falls back to the plain NumPy path
+            # when Numba is absent or batches are small)
             if i == 0:
-                model.add(Linear(input_size, layer_sizes[i]))
+                model.add(FusedLinearSigmoid(input_size, layer_sizes[i], self.dtype))
             else:
-                model.add(Linear(layer_sizes[i - 1], layer_sizes[i]))
-            model.add(Sigmoid())
-            # model.add(ReLU())
+                model.add(FusedLinearSigmoid(layer_sizes[i - 1], layer_sizes[i], self.dtype))
 
-        model.add(Linear(layer_sizes[-1], output_size))
-        model.add(Softmax(skip_bprop=True))
+        model.add(Linear(layer_sizes[-1], output_size, self.dtype))
 
-        # Cost
-        loss = CrossEntropyLoss(size_average=True, do_softmax_bprop=True)
+        # Cost. The loss consumes raw logits (fused log-softmax + NLL),
+        # so no trailing Softmax layer is needed during training.
+        loss = CrossEntropyLoss(size_average=True, do_softmax_bprop=True,
+                                from_logits=True)
 
         return model, loss
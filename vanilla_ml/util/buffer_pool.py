@@ -0,0 +1,45 @@
+"""
+Size-keyed pool of reusable ndarrays.
+"""
+import numpy as np
+
+
+class BufferPool(object):
+    """ Pool of free ndarrays keyed by (shape, dtype).
+
+    rent() pops a previously released array of the requested size
+    (or allocates a fresh one), and release() returns an array to the
+    pool. For workloads with fixed shapes per iteration (e.g. minibatch
+    SGD) the pool stabilizes at the maximum working set after the first
+    iteration, making subsequent iterations allocation-free.
+    """
+
+    def __init__(self):
+        self._free = {}
+
+    def rent(self, shape, dtype=np.float64):
+        """ Get an uninitialized array of the given shape and dtype.
+
+        Args:
+            shape (tuple): array shape
+            dtype: array dtype
+
+        Returns:
+            ndarray: array of the requested size.
+
+        """
+        key = (tuple(shape), np.dtype(dtype))
+        free_list = self._free.get(key)
+        if free_list:
+            return free_list.pop()
+        return np.empty(shape, dtype)
+
+    def release(self, arr):
+        """ Return an array to the pool for later reuse.
+
+        Args:
+            arr (ndarray): array previously obtained from rent().
+
+        """
+        key = (arr.shape, arr.dtype)
+        self._free.setdefault(key, []).append(arr)
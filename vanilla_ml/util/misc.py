@@ -4,37 +4,64 @@ Misc utility
 from __future__ import division
 
 import os
+import shutil
+import urllib.request
 from os import path
-import itertools
-import urllib
 
 import numpy as np
 
+try:
+    from scipy.special import expit as _expit
+except ImportError:  # SciPy is optional, fall back to the NumPy version
+    _expit = None
+
 
 def download_file(url, local_path):
     dir_path = path.dirname(local_path)
     if not path.exists(dir_path):
         print("Creating the directory '%s' ..." % dir_path)
-        os.makedirs(dir_path)
+    os.makedirs(dir_path, exist_ok=True)
+
+    # Stream in 1 MiB chunks so peak memory stays bounded for large files
+    with urllib.request.urlopen(url) as response, open(local_path, 'wb') as f:
+        shutil.copyfileobj(response, f, length=1 << 20)
 
-    urllib.URLopener().retrieve(url, local_path)
 
+def sigmoid(x, out=None):
+    """ Numerically stable sigmoid, routed through SciPy's expit C ufunc
+    when SciPy is installed. In the NumPy fallback, exp is only taken of
+    non-positive values, so it never overflows for large |x|.
+    """
+    if _expit is not None:
+        return _expit(x, out=out)
 
-def sigmoid(x):
-    return 1. / (1 + np.exp(-x))
+    x = np.asarray(x, dtype=np.float64)
+    ex = np.exp(-np.abs(x))
+    if out is None:
+        out = np.empty_like(x)
+    pos = x >= 0
+    out[pos] = 1. / (1. + ex[pos])
+    out[~pos] = ex[~pos] / (1. + ex[~pos])
+    return out
 
 
 def sign(x):
-    return 1 if x >= 0 else -1
+    """ Vectorized sign: maps x >= 0 to 1 and x < 0 to -1
+    (unlike np.sign which returns 0 at 0).
+    """
+    x = np.asarray(x)
+    return (x >= 0).astype(np.int8) * 2 - 1
 
 
-def get_penalty(w, factor, penalty):
+def get_penalty(w, factor, penalty, out=None):
     """ Get penalty for the input ndarray.
 
     Args:
         w (ndarray): input data, shape K x P
         factor (float): penalty factor
         penalty (str): penalty type
+        out (Optional[ndarray]): buffer to write the penalty into,
+            shape K x P. Avoids allocating a new array per call.
 
     Returns:
         ndarray: penalty values
@@ -45,7 +72,10 @@ def get_penalty(w, factor, penalty):
     if penalty == 'l1':
         raise Exception("L1 penalty is not supported yet!")
     elif penalty == 'l2':
-        return 2 * factor * w
+        if out is None:
+            out = np.empty_like(w)
+        np.multiply(w, 2. * factor, out=out)
+        return out
     else:
         raise Exception("The penalty '%s' is not supported!" % penalty)
 
@@ -64,12 +94,13 @@ def sign_to_label(y):
     return (y + 1) / 2
 
 
-def one_hot(y, n_classes=None):
-    """ Convert an 1D array to one-hot 2D array (using one-liner trick).
+def one_hot(y, n_classes=None, dtype=np.float32):
+    """ Convert an 1D array to one-hot 2D array.
 
     Args:
         y (ndarray): uint array, shape N
         n_classes (Optional[int]): number of classes.
+        dtype: dtype of the returned array.
 
     Returns:
         ndarray: one-hot 2D array, shape N x K
@@ -77,7 +108,10 @@ def one_hot(y, n_classes=None):
     """
     if n_classes is None:
         n_classes = len(np.unique(y))
-    return np.eye(n_classes)[y]
+    # Direct sparse assignment avoids materializing a K x K identity matrix.
+    out = np.zeros((len(y), n_classes), dtype=dtype)
+    out[np.arange(len(y)), y] = 1
+    return out
 
 
 def softmax(X):
@@ -90,8 +124,13 @@ def softmax(X):
         ndarray: softmax, shape N x 1.
 
     """
-    log_sum_exp_X = log_sum_exp(X)
-    return np.exp(X - log_sum_exp_X[:, None])
+    # Computed inline (rather than via log_sum_exp) so X is swept by
+    # a single exp pass; in-place ops avoid extra temporaries.
+    max_X = X.max(axis=1)
+    out = np.subtract(X, max_X[:, None])
+    np.exp(out, out=out)
+    out /= out.sum(axis=1)[:, None]
+    return out
 
 
 def log_sum_exp(X):
@@ -109,7 +148,24 @@ def log_sum_exp(X):
     return max_X + np.log(np.sum(np.exp(X - max_X[:, None]), axis=1))
 
 
-def train_test_split(X, y, test_size=0.25, random_state=42):
+def logsumexp_cross_entropy(logits, y):
+    """ Compute mean cross-entropy loss directly from logits.
+    Fuses log-softmax and negative log-likelihood via log_sum_exp,
+    so softmax probabilities are never materialized.
+
+    Args:
+        logits (ndarray): unnormalized scores, shape N x K
+        y (ndarray): target labels, shape N
+
+    Returns:
+        float: mean cross-entropy loss.
+
+    """
+    lse = log_sum_exp(logits)
+    return (lse - logits[np.arange(len(y)), y]).mean()
+
+
+def train_test_split(X, y, test_size=0.25, random_state=42, shuffle=True):
     """ Split the data set into training and test sets.
 
     Args:
@@ -117,6 +173,8 @@ def train_test_split(X, y, test_size=0.25, random_state=42):
         y (ndarray): target
         test_size (float): percentage of the test set
         random_state (int): random state
+        shuffle (bool): whether to shuffle before splitting.
+            If False, contiguous views are returned without copying.
 
     Returns:
         tuple: a tuple of X_train, X_test, y_train, y_test
@@ -125,13 +183,27 @@ def train_test_split(X, y, test_size=0.25, random_state=42):
     assert X.shape[0] == y.shape[0], "X, y have mismatched lengths"
     orig_size = X.shape[0]
     train_size = int(orig_size * (1 - test_size))
+
+    if not shuffle:
+        return X[:train_size], X[train_size:], \
+               y[:train_size], y[train_size:]
+
     np.random.seed(random_state)
     rand_indices = np.random.permutation(orig_size)
     train_indices, test_indices = \
         rand_indices[:train_size], rand_indices[train_size:]
 
-    return X[train_indices], X[test_indices], \
-           y[train_indices], y[test_indices]
+    # Gather into preallocated outputs to avoid intermediate copies
+    X_train = np.empty((train_size,) + X.shape[1:], dtype=X.dtype)
+    X_test = np.empty((orig_size - train_size,) + X.shape[1:], dtype=X.dtype)
+    y_train = np.empty((train_size,) + y.shape[1:], dtype=y.dtype)
+    y_test = np.empty((orig_size - train_size,) + y.shape[1:], dtype=y.dtype)
+    np.take(X, train_indices, axis=0, out=X_train)
+    np.take(X, test_indices, axis=0, out=X_test)
+    np.take(y, train_indices, axis=0, out=y_train)
+    np.take(y, test_indices, axis=0, out=y_test)
+
+    return X_train, X_test, y_train, y_test
 
 
 # Adapted from sklearn's make_moons()
@@ -147,26 +219,33 @@ def make_moons(n_samples, noise=0.3, random_state=42):
         tuple: a tuple of X and y
 
     """
-    np.random.seed(random_state)
+    rng = np.random.default_rng(random_state)
 
     n_samples_out = n_samples // 2
     n_samples_in = n_samples - n_samples_out
 
-    outer_circ_x = np.cos(np.linspace(0, np.pi, n_samples_out))
-    outer_circ_y = np.sin(np.linspace(0, np.pi, n_samples_out))
-    inner_circ_x = 1 - np.cos(np.linspace(0, np.pi, n_samples_in))
-    inner_circ_y = 1 - np.sin(np.linspace(0, np.pi, n_samples_in)) - .5
+    # Compute each linspace and its cos/sin once, filling the
+    # preallocated output directly instead of vstack(append(...)).
+    t_out = np.linspace(0, np.pi, n_samples_out)
+    t_in = np.linspace(0, np.pi, n_samples_in)
 
-    X = np.vstack((np.append(outer_circ_x, inner_circ_x),
-                   np.append(outer_circ_y, inner_circ_y))).T
+    X = np.empty((n_samples, 2))
+    X[:n_samples_out, 0] = np.cos(t_out)
+    X[:n_samples_out, 1] = np.sin(t_out)
+    X[n_samples_out:, 0] = 1 - np.cos(t_in)
+    X[n_samples_out:, 1] = 1 - np.sin(t_in) - .5
     y = np.hstack([np.zeros(n_samples_in, dtype=np.intp),
                    np.ones(n_samples_out, dtype=np.intp)])
 
-    # Add noise
-    X += np.random.normal(scale=noise, size=X.shape)
+    # Add noise, filling a reusable buffer in place instead of
+    # allocating a fresh normal sample
+    noise_buf = np.empty_like(X)
+    rng.standard_normal(out=noise_buf)
+    noise_buf *= noise
+    X += noise_buf
 
     # Shuffle
-    shuffled_indices = np.random.permutation(n_samples)
+    shuffled_indices = rng.permutation(n_samples)
     return X[shuffled_indices], y[shuffled_indices]
 
 
@@ -189,13 +268,13 @@ def make_blobs(n_samples=100, n_features=2, n_centers=3, centers=None, cluster_s
         tuple: a tuple of data and target.
 
     """
-    np.random.seed(random_state)
+    rng = np.random.default_rng(random_state)
 
     # Generate random cluster centers if they are not given
     if centers is None:
         center_low, center_high = center_range
-        centers = np.random.uniform(center_low, center_high,
-                                    size=(centers, n_features))
+        centers = rng.uniform(center_low, center_high,
+                              size=(n_centers, n_features))
     else:
         n_centers, n_features = centers.shape
 
@@ -204,26 +283,33 @@ def make_blobs(n_samples=100, n_features=2, n_centers=3, centers=None, cluster_s
     for i in range(n_samples % n_centers):
         n_samples_per_center[i] += 1
 
-    # Generate blobs
-    X, y = [], []
+    # Generate blobs into preallocated outputs, one contiguous slice
+    # per center, instead of appending blocks and concatenating.
+    offsets = np.cumsum([0] + n_samples_per_center)
+    X = np.empty((n_samples, n_features))
+    y = np.empty(n_samples, dtype=np.intp)
     for i, n in enumerate(n_samples_per_center):
-        X.append(centers[i] + np.random.normal(scale=cluster_std, size=(n, n_features)))
-        y += [i] * n
+        start, end = offsets[i], offsets[i + 1]
+        rng.standard_normal(out=X[start:end])
+        X[start:end] *= cluster_std
+        X[start:end] += centers[i]
+        y[start:end] = i
 
-    X = np.concatenate(X)
-    y = np.array(y)
-    rand_indices = np.random.permutation(n_samples)
+    rand_indices = rng.permutation(n_samples)
     return X[rand_indices], y[rand_indices]
 
 
 # TODO: Move this to PairwiseTransformer
-def pairwise_transform(X, y=None):
+def pairwise_transform(X, y=None, block_size=512):
     """ Pairwise transformation.
 
     Args:
         X (ndarray): data points, shape (N, ) or (N, 2).
             If the shape is (N, 2), the second column represents data point's group.
         y (Optional[ndarray]): ranking labels, shape (N, ).
+        block_size (int): number of rows processed per block, which
+            bounds the peak working set to block_size x N instead of
+            the full N x N pair matrix.
 
     Returns:
         tuple: a tuple (X_diff, y_diff)
@@ -236,13 +322,26 @@ def pairwise_transform(X, y=None):
     N = X.shape[0]
     y = np.asarray(y) if y is not None else np.arange(N)
 
-    X_diff, y_diff = [], []
-
-    for i, j in itertools.combinations(range(N), 2):
-        # Skip the pair of data points that have the same ranks
-        if y[i] == y[j]:
-            continue
-        X_diff.append(X[i] - X[j])
-        y_diff.append(np.sign(y[i] - y[j]))
-
-    return np.asarray(X_diff), np.asarray(y_diff)
+    # Count the valid pairs (i < j with different ranks) from the label
+    # counts, then size the outputs up front.
+    _, counts = np.unique(y, return_counts=True)
+    n_pairs = N * (N - 1) // 2 - int(np.sum(counts * (counts - 1)) // 2)
+    X_diff = np.empty((n_pairs,) + X.shape[1:], dtype=X.dtype)
+    y_diff = np.empty(n_pairs, dtype=np.int8)
+
+    # Stream row-blocks of the pair matrix: vectorized version of
+    # iterating over itertools.combinations(range(N), 2), keeping pairs
+    # with different ranks.
+    cols = np.arange(N)
+    write = 0
+    for i0 in range(0, N, block_size):
+        rows = np.arange(i0, min(i0 + block_size, N))
+        mask = (y[rows][:, None] != y[None, :]) & (cols[None, :] > rows[:, None])
+        ii, jj = np.nonzero(mask)
+        ii = rows[ii]
+        n = len(ii)
+        np.subtract(X[ii], X[jj], out=X_diff[write:write + n])
+        y_diff[write:write + n] = np.where(y[ii] > y[jj], np.int8(1), np.int8(-1))
+        write += n
+
+    return X_diff, y_diff